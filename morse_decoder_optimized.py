@@ -1,11 +1,9 @@
 import time
 import numpy as np
-import soundfile as sf
 from scipy import signal
-from win_capture_audio import AudioCapture, AudioStream, find_process_by_name
+from win_capture_audio import AudioCapture, AudioRingBuffer, AudioStream, find_process_by_name
 import threading
-import queue
-from collections import deque
+import _thread
 import sys
 from rich.console import Console
 from rich.panel import Panel
@@ -14,33 +12,145 @@ from rich.live import Live
 from rich.layout import Layout
 from rich.text import Text
 from rich.align import Align
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from datetime import datetime
-import msvcrt  # Windows平台的键盘输入
+if sys.platform == 'win32':
+    import msvcrt  # Windows平台的键盘输入
+else:
+    msvcrt = None  # 其他平台没有键盘控制，仅便于开发时导入本模块
 import itertools  # 用于生成排列组合
+import functools
+
+# 音频线程产生的事件类型
+EVENT_SIGNAL = 0  # 一段信号结束，数值为信号持续时间(ns)
+EVENT_SILENCE = 1  # 处于静默中，数值为已静默的时间(ns)
+
+# 数字摩斯电码字典（仅保留数字）
+MORSE_DIGITS = {
+    '-----': '0', '.----': '1', '..---': '2',
+    '...--': '3', '....-': '4', '.....': '5',
+    '-....': '6', '--...': '7', '---..': '8',
+    '----.': '9'
+}
+
+
+# 打包摩斯码的初始值：最高位是哨兵位，其后每位一个点(0)或划(1)，长度由哨兵位置隐含
+CODE_EMPTY = 1
+
+
+def build_digit_lut():
+    """把摩斯码字典转换为以带哨兵位的打包码为下标的64项查找表，值为数字的ASCII码"""
+    lut = [None] * 64
+    for code, digit in MORSE_DIGITS.items():
+        lut[(1 << len(code)) | int(code.replace('.', '0').replace('-', '1'), 2)] = ord(digit)
+    return tuple(lut)
+
+
+MORSE_DIGIT_LUT = build_digit_lut()  # 导入时构建一次，所有解码器共享
+
+AUDIO_RING_FRAMES = 1 << 16  # 音频环形缓冲区容量（约1.5秒@44.1kHz）
+
+ENERGY_HISTORY_SIZE = 64  # 能量历史长度（2的幂，便于掩码回绕）
+ENERGY_HISTORY_MASK = ENERGY_HISTORY_SIZE - 1
+ENERGY_SCALE = 32768.0  # 能量量化为int16时的比例（RMS为1.0时满幅）
+SIGNAL_HISTORY_SIZE = 10  # 界面显示的最近信号个数
+
+# 默认采样率和摩斯音调的频率范围
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_LOWCUT = 4150.0
+DEFAULT_HIGHCUT = 4300.0
+FILTER_TUNE_STEP = 50.0  # 按键调节频率范围的步长(Hz)
+
+
+@functools.lru_cache(maxsize=None)
+def design_bandpass_sos(sample_rate, lowcut, highcut):
+    """设计带通滤波器，返回float32连续SOS系数，相同参数只设计一次"""
+    nyquist = 0.5 * sample_rate
+    low = lowcut / nyquist
+    high = highcut / nyquist
+    
+    # 确保频率范围有效
+    low = max(0.01, min(low, 0.99))  # 限制在有效范围内
+    high = max(low + 0.01, min(high, 0.99))  # 确保high > low
+    
+    # 使用二阶节(SOS)形式：窄带高阶滤波器在b/a形式下数值不稳定
+    sos = signal.butter(5, [low, high], btype='band', output='sos')
+    # 与音频数据同为float32，避免sosfilt把输入提升为float64
+    # 注意：缓存的系数被多个解码器共享，调用方不得原地修改
+    return np.ascontiguousarray(sos, dtype=np.float32)
+
+
+@functools.lru_cache(maxsize=256)
+def format_clock(seconds):
+    """把整秒时间戳格式化为HH:MM:SS，同一秒只格式化一次"""
+    return time.strftime('%H:%M:%S', time.localtime(seconds))
+
+
+# 导入时设计好默认参数的滤波器，创建解码器时直接命中缓存
+DEFAULT_SOS = design_bandpass_sos(DEFAULT_SAMPLE_RATE, DEFAULT_LOWCUT, DEFAULT_HIGHCUT)
+
+
+# 3位和4位密码的排列下标表，形状分别为(6, 3)和(24, 4)
+PERMUTATION_INDEX = {
+    n: np.array(list(itertools.permutations(range(n))), dtype=np.intp) for n in (3, 4)
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def score_permutations(password):
+    """一次算出密码所有排列的置信度，返回按字典序排列的(排列, 置信度)，结果按密码缓存"""
+    original = np.frombuffer(password.encode('ascii'), dtype=np.uint8)
+    length = len(original)
+    # 一次花式索引得到所有排列，np.unique按行去重并排序（ASCII顺序即字典序）
+    perms = np.unique(original[PERMUTATION_INDEX[length]], axis=0)
+    digits = perms.astype(np.int16)
+    steps = np.diff(digits, axis=1)
+    
+    # 不同数字个数：排序后相邻数字不同的次数+1
+    unique_digits = 1 + (np.diff(np.sort(digits, axis=1), axis=1) != 0).sum(axis=1)
+    # 最长连续相同数字的长度
+    run = np.zeros(len(perms), dtype=np.int16)
+    longest = np.zeros_like(run)
+    for same in (steps == 0).T:
+        run = (run + 1) * same
+        np.maximum(longest, run, out=longest)
+    max_consecutive = longest + 1
+    
+    # 如果排列与原序列相同，置信度最高，否则为基础置信度
+    confidence = np.where((perms == original).all(axis=1), 95, 50)
+    confidence += 20 * (steps > 0).all(axis=1)  # 顺序递增模式 (如123, 1234)
+    confidence += 15 * (steps < 0).all(axis=1)  # 顺序递减模式 (如321, 4321)
+    # 重复数字较少的排列置信度更高
+    confidence += 10 * (unique_digits == length) + 5 * (unique_digits == length - 1)
+    # 避免过多连续相同数字
+    confidence -= 10 * np.maximum(max_consecutive - 2, 0)
+    np.clip(confidence, 0, 100, out=confidence)  # 限制在0-100之间
+    
+    passwords = [row.tobytes().decode('ascii') for row in perms]
+    return tuple(zip(passwords, confidence.tolist()))
+
 
 class MorseCodeDecoderGUI:
     def __init__(self):
         # 初始化Rich控制台
         self.console = Console()
         
-        # 数字摩斯电码字典（仅保留数字）
-        self.morse_dict = {
-            '-----': '0', '.----': '1', '..---': '2',
-            '...--': '3', '....-': '4', '.....': '5', 
-            '-....': '6', '--...': '7', '---..': '8', 
-            '----.': '9'
-        }
-        
         # 解码参数
         self.threshold = 0.003
+        self.auto_threshold = False  # 是否根据背景噪声自动调节阈值
+        self.noise_multiplier = 4.0  # 自动阈值 = 噪声基底 × 倍数
+        self.min_threshold = 0.001  # 自动阈值的下限
         self.dot_duration = 0.02
         self.dash_duration = 0.05
         self.letter_gap = 0.8
         self.word_gap = 0.4
+        # 换算为纳秒整数，与按采样数换算的信号时间(ns)直接比较
+        self.dot_duration_ns = int(self.dot_duration * 1e9)
+        self.dash_duration_ns = int(self.dash_duration * 1e9)
+        self.letter_gap_ns = int(self.letter_gap * 1e9)
+        self.word_gap_ns = int(self.word_gap * 1e9)
+        self.envelope_window = 0.01  # 能量包络窗口(秒)，决定边沿的时间分辨率
         
         # 数字序列相关参数
-        self.current_number_sequence = ""
+        self.sequence_digits = bytearray()  # 当前数字序列（ASCII），追加为O(1)
         self.expected_digits = [3, 4]  # 三角洲游戏中的数字是3位或4位
         self.number_sequences = []  # 存储完整的数字序列
         self.last_digit_time = 0
@@ -48,76 +158,157 @@ class MorseCodeDecoderGUI:
         # 密码排列分析
         self.password_candidates = []  # 存储可能的密码排列
         self.show_permutations = True  # 是否显示排列组合
+        self.analysis_cache = (None, [])  # (输入序列的键, 候选列表)，输入未变化时复用
         
         # 状态管理
         self.is_signal_on = False
         self.signal_start_time = 0
         self.last_signal_time = 0
-        self.current_code = ""
+        self.code_bits = CODE_EMPTY  # 当前摩斯码的按位打包值（带哨兵位）
         self.decoded_text = ""
         self.running = True
-        self.signal_history = deque(maxlen=10)  # 存储最近的信号
+        # 最近信号的环形缓冲区：类型(0=点, 1=划)和时间
+        self.signal_history = np.zeros(SIGNAL_HISTORY_SIZE, dtype=[('kind', 'u1'), ('time', 'i8')])
+        self.signal_count = 0  # 累计记录的信号个数
+        self.decoder_thread = None
         
         # 滤波器参数
-        self.sample_rate = 44100
-        self.lowcut = 4150.0
-        self.highcut = 4300.0
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.channels = 2
+        self.lowcut = DEFAULT_LOWCUT
+        self.highcut = DEFAULT_HIGHCUT
+        # 键盘线程只记录请求的频率范围，由解码线程在处理音频前应用
+        self.requested_band = (self.lowcut, self.highcut)
+        
+        # 采集线程只把原始数据写入audio_ring，信号处理和解码都在解码线程中进行
+        self.audio_ring = AudioRingBuffer(AUDIO_RING_FRAMES, self.channels)
+        self.audio_ready = threading.Event()  # 有新音频时唤醒解码线程
+        # 边沿检测 -> 解码的事件列表：(时间戳ns, 类型, 数值ns)，两端都在解码线程中
+        self.events = []
         
         # 创建带通滤波器
-        self.b, self.a = self.create_bandpass_filter()
+        self.sos = self.create_bandpass_filter()
+        self.zi = None  # 滤波器状态，跨音频块保持连续
+        
+        # 检测方式：Goertzel单频检测（默认），或带通滤波+RMS
+        # 带通滤波器的振铃会拉长短促的点，Goertzel按窗口独立计算，没有这个问题
+        self.use_goertzel = True
         
         # 音频缓冲区和处理
-        self.audio_buffer = deque(maxlen=1024)
-        self.energy_history = deque(maxlen=50)
+        self.batch_size = 4096  # 累积到该采样数后统一处理，摊薄每次滤波调用的开销
+        # 帧长固定，窗口划分和各窗口长度的Goertzel核都提前算好，第一帧音频不再付出这部分开销
+        self.frame_bounds = self.create_envelope_bounds(self.batch_size)
+        self.goertzel_kernels = self.create_goertzel_kernels()  # 按窗口长度缓存的Goertzel核
+        self.pending_audio = np.empty(self.batch_size, dtype=np.float32)  # 定长的单声道帧
+        self.pending_length = 0
+        self.samples_processed = 0  # 已处理的采样数，作为信号计时的时钟
+        self.energy_history = np.zeros(ENERGY_HISTORY_SIZE, dtype=np.int16)  # 量化能量的环形缓冲区
+        self.energy_count = 0  # 累计写入的能量个数
         
         # 统计信息
         self.total_signals = 0
         self.total_letters = 0
-        self.start_time = time.time()
+        self.start_time = time.monotonic_ns()
+        self.runtime_seconds = -1  # 上次格式化运行时间时的秒数
+        self.runtime_text = ""
         
         # 创建布局
         self.layout = Layout()
         self.setup_layout()
+        self.last_status_state = None  # 上次渲染状态面板时的状态，未变化则复用面板
+        self.last_decoding_state = None  # 上次渲染解码面板时的状态，未变化则复用面板
+
+    @property
+    def current_number_sequence(self):
+        """当前数字序列的字符串形式"""
+        return self.sequence_digits.decode('ascii')
+
+    def format_current_code(self):
+        """把打包的当前摩斯码还原为点划字符串（仅用于显示）"""
+        # 去掉'0b1'前缀（其中的1是哨兵位）
+        return bin(self.code_bits)[3:].replace('0', '.').replace('1', '-')
 
     def create_bandpass_filter(self):
         """创建带通滤波器"""
-        nyquist = 0.5 * self.sample_rate
-        low = self.lowcut / nyquist
-        high = self.highcut / nyquist
-        
-        # 确保频率范围有效
-        low = max(0.01, min(low, 0.99))  # 限制在有效范围内
-        high = max(low + 0.01, min(high, 0.99))  # 确保high > low
-        
         try:
-            b, a = signal.butter(5, [low, high], btype='band', output='ba')
-            return b, a
+            return design_bandpass_sos(self.sample_rate, self.lowcut, self.highcut)
         except Exception as e:
             # 如果滤波器创建失败，使用更保守的参数
             print(f"滤波器创建失败，使用默认参数: {e}")
-            b, a = signal.butter(3, [0.1, 0.4], btype='band', output='ba')
-            return b, a
+            sos = signal.butter(3, [0.1, 0.4], btype='band', output='sos')
+            return np.ascontiguousarray(sos, dtype=np.float32)
 
-    def apply_bandpass_filter(self, data):
-        """应用带通滤波器"""
-        return signal.lfilter(self.b, self.a, data)
+    def retune_filter(self, lowcut, highcut):
+        """请求修改检测的频率范围（键盘线程调用），实际切换由解码线程完成"""
+        if lowcut <= 0 or highcut >= 0.5 * self.sample_rate:
+            return
+        self.requested_band = (lowcut, highcut)
+
+    def apply_requested_band(self):
+        """应用请求的频率范围（解码线程调用），重新设计滤波器并清空依赖频率的状态"""
+        band = self.requested_band
+        if band == (self.lowcut, self.highcut):
+            return
+        self.lowcut, self.highcut = band
+        self.sos = self.create_bandpass_filter()
+        self.zi = None
+        self.goertzel_kernels = self.create_goertzel_kernels()
 
-    def calculate_energy(self, data):
-        """计算音频数据的能量"""
-        return np.sqrt(np.mean(data**2))
+    def apply_bandpass_filter(self, data):
+        """应用带通滤波器（保留跨块的滤波器状态，避免块边界瞬态）"""
+        if self.zi is None:
+            self.zi = (signal.sosfilt_zi(self.sos) * data[0]).astype(np.float32)
+        filtered, self.zi = signal.sosfilt(self.sos, data, zi=self.zi)
+        return filtered
+
+    def create_goertzel_kernel(self, length):
+        """创建中心频率处加Hann窗的余弦/正弦核"""
+        center = 0.5 * (self.lowcut + self.highcut)
+        window = signal.get_window('hann', length)
+        phase = 2 * np.pi * center / self.sample_rate * np.arange(length)
+        # 归一化，使纯音的输出与其RMS一致，阈值可以沿用
+        scale = np.sqrt(2) / window.sum()
+        kernel = np.vstack((np.cos(phase), np.sin(phase))) * (window * scale)
+        return kernel.astype(np.float32)
+
+    def create_goertzel_kernels(self):
+        """为定长帧中出现的各窗口长度预先创建Goertzel核"""
+        lengths = np.unique(np.diff(self.frame_bounds)).tolist()
+        return {length: self.create_goertzel_kernel(length) for length in lengths}
+
+    def calculate_tone_energy(self, data):
+        """Goertzel单频检测：一次矩阵乘法得到中心频率处的能量"""
+        kernel = self.goertzel_kernels.get(data.size)
+        if kernel is None:
+            kernel = self.create_goertzel_kernel(data.size)
+            self.goertzel_kernels[data.size] = kernel
+        real, imag = kernel @ data
+        return np.hypot(real, imag)
+
+    def calculate_energy(self, data, bounds):
+        """计算各窗口的RMS能量：原地平方后按窗口一次性求和（会覆盖data）"""
+        np.square(data, out=data)
+        window_sums = np.add.reduceat(data, bounds[:-1])
+        # 原地除法和开方，结果保持float32（除以整数长度会把结果提升为float64）
+        np.divide(window_sums, np.diff(bounds), out=window_sums)
+        return np.sqrt(window_sums, out=window_sums)
 
     def setup_layout(self):
         """设置界面布局"""
         self.layout.split_column(
             Layout(name="header", size=4),
             Layout(name="main"),
-            Layout(name="footer", size=6)
+            Layout(name="footer", size=7)
         )
         
         self.layout["main"].split_row(
             Layout(name="left", ratio=2),
             Layout(name="right", ratio=3)
         )
+        
+        # 底部帮助信息不会变化，只创建一次
+        self.layout["footer"].update(self.create_footer())
+        self.setup_status_panel()
 
     def create_header(self):
         """创建头部显示"""
@@ -133,38 +324,65 @@ class MorseCodeDecoderGUI:
             padding=(0, 1)
         )
 
-    def create_status_panel(self):
-        """创建状态面板"""
+    def setup_status_panel(self):
+        """创建状态面板，值单元格是Text对象，之后只原地修改其内容"""
         table = Table(show_header=False, box=None)
         table.add_column("参数", style="cyan")
         table.add_column("值", style="green")
         
-        table.add_row("🎯 阈值", f"{self.threshold:.6f}")
-        table.add_row("⏱️ 点持续时间", f"{self.dot_duration:.3f}s")
-        table.add_row("⏱️ 划持续时间", f"{self.dash_duration:.3f}s")
-        table.add_row("📏 字母间隔", f"{self.letter_gap:.3f}s")
-        table.add_row("📏 单词间隔", f"{self.word_gap:.3f}s")
-        table.add_row("🔊 频率范围", f"{self.lowcut:.0f}-{self.highcut:.0f}Hz")
-        
-        # 添加分隔线
-        table.add_row("", "")
-        table.add_row("📊 总信号数", str(self.total_signals))
-        table.add_row("� 总数字数", str(self.total_letters))
-        table.add_row("📋 完整序列数", str(len(self.number_sequences)))
-        
-        if self.energy_history:
-            current_energy = self.energy_history[-1] if self.energy_history else 0
-            table.add_row("⚡ 当前能量", f"{current_energy:.6f}")
-        
-        return Panel(table, title="[bold cyan]系统状态[/bold cyan]", border_style="cyan")
+        rows = [
+            ("threshold", "🎯 阈值"),
+            ("dot_duration", "⏱️ 点持续时间"),
+            ("dash_duration", "⏱️ 划持续时间"),
+            ("letter_gap", "📏 字母间隔"),
+            ("word_gap", "📏 单词间隔"),
+            ("band", "🔊 频率范围"),
+            ("detector", "🎛️ 检测方式"),
+            (None, ""),  # 分隔线
+            ("total_signals", "📊 总信号数"),
+            ("total_letters", "� 总数字数"),
+            ("sequences", "📋 完整序列数"),
+            ("energy", "⚡ 当前能量"),
+        ]
+        self.status_cells = {}
+        for key, label in rows:
+            cell = Text()
+            if key is not None:
+                self.status_cells[key] = cell
+            table.add_row(label, cell)
+        
+        self.status_panel = Panel(table, title="[bold cyan]系统状态[/bold cyan]", border_style="cyan")
+
+    def create_status_panel(self):
+        """更新状态面板各单元格的内容，返回同一个面板"""
+        cells = self.status_cells
+        auto = " (自动)" if self.auto_threshold else ""
+        cells["threshold"].plain = f"{self.threshold:.6f}{auto}"
+        cells["dot_duration"].plain = f"{self.dot_duration:.3f}s"
+        cells["dash_duration"].plain = f"{self.dash_duration:.3f}s"
+        cells["letter_gap"].plain = f"{self.letter_gap:.3f}s"
+        cells["word_gap"].plain = f"{self.word_gap:.3f}s"
+        cells["band"].plain = f"{self.lowcut:.0f}-{self.highcut:.0f}Hz"
+        cells["detector"].plain = "Goertzel" if self.use_goertzel else "带通滤波"
+        cells["total_signals"].plain = str(self.total_signals)
+        cells["total_letters"].plain = str(self.total_letters)
+        cells["sequences"].plain = str(len(self.number_sequences))
+        
+        if self.energy_count:
+            current_energy = self.energy_history[(self.energy_count - 1) & ENERGY_HISTORY_MASK] / ENERGY_SCALE
+            cells["energy"].plain = f"{current_energy:.6f}"
+        
+        return self.status_panel
 
     def create_decoding_panel(self):
         """创建解码面板"""
         # 当前摩斯码
-        current_morse = Text(self.current_code if self.current_code else "等待信号...", style="yellow bold")
+        current_code = self.format_current_code()
+        current_morse = Text(current_code if current_code else "等待信号...", style="yellow bold")
         
         # 当前数字序列
-        current_sequence = Text(self.current_number_sequence if self.current_number_sequence else "无", style="blue bold")
+        current_digits = self.current_number_sequence
+        current_sequence = Text(current_digits if current_digits else "无", style="blue bold")
         
         # 完整的数字序列
         sequences_text = ""
@@ -198,17 +416,16 @@ class MorseCodeDecoderGUI:
                 password_candidates_text = "\n[dim]等待更多数据进行分析...[/dim]"
         
         # 最近信号历史
-        signal_text = ""
-        for i, (signal_type, timestamp) in enumerate(self.signal_history):
-            signal_text += f"{signal_type} "
-            if i % 15 == 14:  # 每15个信号换行
-                signal_text += "\n"
+        symbols = np.where(self.get_recent_signals(), "-", ".")
+        signal_text = "\n".join(  # 每15个信号换行
+            " ".join(symbols[i:i + 15]) + " " for i in range(0, len(symbols), 15)
+        )
         
         content = f"""[bold yellow]当前摩斯码:[/bold yellow]
 {current_morse}
 
 [bold blue]当前数字序列:[/bold blue]
-{current_sequence} ({len(self.current_number_sequence)}位)
+{current_sequence} ({len(current_digits)}位)
 
 [bold green]最近完整序列:[/bold green]
 {sequences_text}{password_candidates_text}
@@ -222,41 +439,153 @@ class MorseCodeDecoderGUI:
         """创建底部信息"""
         help_text = """[dim]按键控制:[/dim]
 [cyan]ESC[/cyan] - 退出程序  [cyan]r[/cyan] - 重置文本  [cyan]s[/cyan] - 保存结果  [cyan]p[/cyan] - 切换排列显示
-[cyan]↑[/cyan] - 增加阈值  [cyan]↓[/cyan] - 减少阈值  [cyan]1-9[/cyan] - 快速设置阈值
+[cyan]↑[/cyan] - 增加阈值  [cyan]↓[/cyan] - 减少阈值  [cyan]1-9[/cyan] - 快速设置阈值  [cyan]a[/cyan] - 自动阈值
+[cyan]g[/cyan] - 切换检测方式  [cyan]\\[ ][/cyan] - 频率范围下移/上移
 [yellow]💡 如果密码顺序错误，查看"可能的密码组合"部分[/yellow]"""
         
-        return Panel(help_text, style="dim", height=6)
+        return Panel(help_text, style="dim", height=7)
 
     def get_runtime(self):
-        """获取运行时间"""
-        runtime = time.time() - self.start_time
-        hours = int(runtime // 3600)
-        minutes = int((runtime % 3600) // 60)
-        seconds = int(runtime % 60)
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        """获取运行时间（同一秒内复用上次格式化的结果）"""
+        elapsed = (time.monotonic_ns() - self.start_time) // 1_000_000_000
+        if elapsed != self.runtime_seconds:
+            hours, remainder = divmod(elapsed, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            self.runtime_text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+            self.runtime_seconds = elapsed
+        return self.runtime_text
+
+    def get_status_state(self):
+        """状态面板依赖的状态，用于判断是否需要重建面板"""
+        current_energy = None
+        if self.energy_count:
+            current_energy = self.energy_history[(self.energy_count - 1) & ENERGY_HISTORY_MASK]
+        return (
+            self.threshold, self.auto_threshold, self.use_goertzel, self.lowcut,
+            self.total_signals, self.total_letters, len(self.number_sequences),
+            current_energy
+        )
+
+    def get_decoding_state(self):
+        """解码面板依赖的状态，用于判断是否需要重建面板"""
+        return (
+            self.total_signals, self.total_letters, len(self.number_sequences),
+            self.signal_count, self.code_bits,
+            bytes(self.sequence_digits), self.show_permutations
+        )
 
     def render_interface(self):
         """渲染界面"""
         self.layout["header"].update(self.create_header())
-        self.layout["left"].update(self.create_status_panel())
-        self.layout["right"].update(self.create_decoding_panel())
-        self.layout["footer"].update(self.create_footer())
+        
+        # 状态面板和解码面板只在各自依赖的状态变化时重建
+        status_state = self.get_status_state()
+        if status_state != self.last_status_state:
+            self.layout["left"].update(self.create_status_panel())
+            self.last_status_state = status_state
+        
+        decoding_state = self.get_decoding_state()
+        if decoding_state != self.last_decoding_state:
+            self.layout["right"].update(self.create_decoding_panel())
+            self.last_decoding_state = decoding_state
+        
         return self.layout
 
     def process_audio_chunk(self, audio_data):
         """处理音频块并检测摩斯电码"""
-        # 应用带通滤波器
-        if audio_data.ndim == 2:
-            audio_data = np.mean(audio_data, axis=1)
-        
-        filtered_data = self.apply_bandpass_filter(audio_data)
-        energy = self.calculate_energy(filtered_data)
-        self.energy_history.append(energy)
-        
-        current_time = time.time()
+        # 统一为连续的float32数据
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+        
+        # 混合为单声道后填入定长帧，每填满一帧处理一次，剩余部分留到下一帧
+        offset = 0
+        while offset < len(audio_data):
+            count = min(self.batch_size - self.pending_length, len(audio_data) - offset)
+            destination = self.pending_audio[self.pending_length:self.pending_length + count]
+            self.downmix(audio_data[offset:offset + count], destination)
+            self.pending_length += count
+            offset += count
+            if self.pending_length == self.batch_size:
+                self.process_frame(self.pending_audio)
+                self.pending_length = 0
+
+    def downmix(self, audio_data, destination):
+        """把音频混合为单声道，直接写入destination"""
+        if audio_data.ndim == 1:
+            destination[:] = audio_data
+        elif audio_data.shape[1] == 2:
+            np.add(audio_data[:, 0], audio_data[:, 1], out=destination)
+            destination *= 0.5
+        else:
+            np.mean(audio_data, axis=1, out=destination)
+
+    def process_frame(self, frame):
+        """对一帧单声道音频做能量检测，并驱动信号状态机（会覆盖frame）"""
+        # 按采样数计时：与处理的时刻无关，窗口时间精确到采样
+        frame_start = self.samples_processed
+        self.samples_processed += len(frame)
+        
+        energies, window_ends = self.compute_envelope(frame)
+        levels = self.quantize_energy(energies)
+        self.record_energy(levels)
+        
+        # 阈值比较在量化后的整数上进行
+        threshold_level = int(self.threshold * ENERGY_SCALE)
+        sample_rate = self.sample_rate
+        # 纳秒换算用Python整数，避免int32/int64溢出
+        for level, window_end in zip(levels.tolist(), window_ends.tolist()):
+            window_time = (frame_start + window_end) * 1_000_000_000 // sample_rate
+            self.update_signal_state(level > threshold_level, window_time)
+        
+        if self.auto_threshold:
+            self.update_auto_threshold()
+
+    def record_energy(self, levels):
+        """把一批量化能量写入环形缓冲区，超出容量时只保留最新的部分"""
+        recent = levels[-ENERGY_HISTORY_SIZE:]
+        start = self.energy_count + len(levels) - len(recent)
+        self.energy_history[(start + np.arange(len(recent))) & ENERGY_HISTORY_MASK] = recent
+        self.energy_count += len(levels)
+
+    def update_auto_threshold(self):
+        """根据能量历史估计背景噪声基底，并据此设置阈值"""
+        if self.energy_count < ENERGY_HISTORY_SIZE:
+            return
+        # 取第25百分位作为噪声基底，摩斯信号占据的窗口不会影响估计
+        noise_level = np.partition(self.energy_history, ENERGY_HISTORY_SIZE // 4)[ENERGY_HISTORY_SIZE // 4]
+        noise_floor = noise_level / ENERGY_SCALE
+        self.threshold = max(noise_floor * self.noise_multiplier, self.min_threshold)
+
+    def quantize_energy(self, energies):
+        """把窗口能量量化为int16，超出范围的能量截断为满幅"""
+        levels = np.asarray(energies, dtype=np.float32) * ENERGY_SCALE
+        return np.minimum(levels, np.iinfo(np.int16).max).astype(np.int16)
+
+    def create_envelope_bounds(self, chunk_length):
+        """把长度为chunk_length的音频块均匀切成约envelope_window长的窗口，返回各窗口边界"""
+        window_length = int(self.envelope_window * self.sample_rate)
+        window_count = max(1, chunk_length // window_length)
+        return np.linspace(0, chunk_length, window_count + 1).astype(np.int64)
+
+    def compute_envelope(self, audio_data):
+        """把音频块切成若干短窗口，返回每个窗口的能量和窗口结束位置"""
+        chunk_length = len(audio_data)
+        if chunk_length == self.batch_size:
+            bounds = self.frame_bounds
+        else:
+            bounds = self.create_envelope_bounds(chunk_length)
         
+        if self.use_goertzel:
+            energies = [self.calculate_tone_energy(audio_data[start:end])
+                        for start, end in zip(bounds[:-1], bounds[1:])]
+        else:
+            # 应用带通滤波器，滤波输出直接用于计算能量，不再分配中间数组
+            energies = self.calculate_energy(self.apply_bandpass_filter(audio_data), bounds)
+        return energies, bounds[1:]
+
+    def update_signal_state(self, signal_on, current_time):
+        """根据窗口是否超过阈值更新信号状态机"""
         # 检测信号状态
-        if energy > self.threshold:
+        if signal_on:
             if not self.is_signal_on:
                 self.is_signal_on = True
                 self.signal_start_time = current_time
@@ -264,134 +593,189 @@ class MorseCodeDecoderGUI:
             if self.is_signal_on:
                 self.is_signal_on = False
                 signal_duration = current_time - self.signal_start_time
-                self.process_signal_duration(signal_duration)
+                self.events.append((current_time, EVENT_SIGNAL, signal_duration))
                 self.last_signal_time = current_time
-                self.total_signals += 1
         
         # 检查间隔时间
         if not self.is_signal_on and self.last_signal_time > 0:
             silence_duration = current_time - self.last_signal_time
-            self.process_silence_duration(silence_duration)
+            self.events.append((current_time, EVENT_SILENCE, silence_duration))
+
+    def start_decoding(self):
+        """启动解码线程，音频线程只负责把数据写入环形缓冲区"""
+        self.decoder_thread = threading.Thread(target=self.decode_loop, daemon=True)
+        self.decoder_thread.start()
+
+    def stop_decoding(self):
+        """停止解码线程，并处理剩余的音频和事件"""
+        self.running = False
+        self.audio_ready.set()
+        if self.decoder_thread is not None:
+            self.decoder_thread.join()
+            self.decoder_thread = None
+        self.process_pending_audio()
+        self.process_events()
+
+    def decode_loop(self):
+        """解码线程：等待音频线程写入的数据，进行信号处理并解码"""
+        while self.running:
+            self.audio_ready.wait(timeout=0.1)
+            self.audio_ready.clear()
+            self.process_pending_audio()
+            self.process_events()
+
+    def process_pending_audio(self):
+        """处理环形缓冲区中所有未处理的音频，直接在缓冲区的视图上处理，不复制"""
+        self.apply_requested_band()
+        first, second = self.audio_ring.read_slices()
+        for frames in (first, second):
+            if len(frames):
+                self.process_audio_chunk(frames)
+        self.audio_ring.commit_read(len(first) + len(second))
+
+    def process_events(self):
+        """处理边沿检测产生的事件，更新摩斯码和数字序列"""
+        events, self.events = self.events, []
+        for timestamp, kind, value in events:
+            if kind == EVENT_SIGNAL:
+                self.process_signal_duration(value)
+                self.total_signals += 1
+            else:
+                self.process_silence_duration(value)
 
     def process_signal_duration(self, duration):
-        """根据信号持续时间判断是点还是划"""
-        if duration < self.dot_duration:
-            return
-        elif duration < self.dash_duration:
-            self.current_code += "."
-            self.signal_history.append((".", time.time()))
-        else:
-            self.current_code += "-"
-            self.signal_history.append(("-", time.time()))
+        """根据信号持续时间(ns)判断是点还是划"""
+        # 与两个阈值比较的结果相加：0=过短(噪声)，1=点，2=划
+        symbol = (duration >= self.dot_duration_ns) + (duration >= self.dash_duration_ns)
+        if symbol:
+            bit = symbol - 1  # 点=0，划=1
+            self.code_bits = (self.code_bits << 1) | bit
+            self.record_signal(bit)
+
+    def record_signal(self, kind):
+        """记录一个信号(0=点, 1=划)到最近信号历史"""
+        self.signal_history[self.signal_count % SIGNAL_HISTORY_SIZE] = (kind, time.monotonic_ns())
+        self.signal_count += 1
+
+    def get_recent_signals(self):
+        """按时间顺序返回最近信号的类型数组"""
+        count = min(self.signal_count, SIGNAL_HISTORY_SIZE)
+        order = np.arange(self.signal_count - count, self.signal_count) % SIGNAL_HISTORY_SIZE
+        return self.signal_history['kind'][order]
 
     def process_silence_duration(self, duration):
-        """根据静默持续时间判断数字间隔或序列结束"""
-        if duration > self.word_gap:
-            # 长间隔：可能是序列结束
-            if self.current_code:
-                self.decode_current_code()
-            
-            # 如果当前序列不为空且超过一定时间，强制完成序列
-            if self.current_number_sequence and len(self.current_number_sequence) >= 3:
-                self.force_complete_sequence()
-                
-        elif duration > self.letter_gap:
-            # 数字间隔
-            if self.current_code:
-                self.decode_current_code()
+        """根据静默持续时间(ns)判断数字间隔或序列结束"""
+        # 长间隔：可能是序列结束
+        sequence_gap = duration > self.word_gap_ns
+        
+        # 任一间隔都表示当前数字结束
+        if self.code_bits != CODE_EMPTY and (sequence_gap or duration > self.letter_gap_ns):
+            self.decode_current_code()
+        
+        # 如果当前序列已有3位以上且间隔足够长，强制完成序列
+        if sequence_gap and len(self.sequence_digits) >= 3:
+            self.force_complete_sequence()
     
     def force_complete_sequence(self):
         """强制完成当前数字序列"""
-        if self.current_number_sequence:
+        if self.sequence_digits:
             sequence_info = {
                 'sequence': self.current_number_sequence,
-                'length': len(self.current_number_sequence),
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'length': len(self.sequence_digits),
                 'complete_time': time.time(),
                 'forced': True  # 标记为强制完成
             }
             self.number_sequences.append(sequence_info)
-            self.current_number_sequence = ""
+            self.sequence_digits.clear()
 
     def decode_current_code(self):
         """解码当前的摩斯电码"""
-        if self.current_code in self.morse_dict:
-            digit = self.morse_dict[self.current_code]
-            self.current_number_sequence += digit
-            self.last_digit_time = time.time()
+        # 超过5个点划的码不在表中
+        digit = MORSE_DIGIT_LUT[self.code_bits] if self.code_bits < len(MORSE_DIGIT_LUT) else None
+        if digit is not None:
+            self.sequence_digits.append(digit)
+            self.last_digit_time = time.monotonic_ns()
             self.total_letters += 1
             
             # 检查是否完成了一个有效的数字序列
             self.check_complete_sequence()
         
-        self.current_code = ""
+        self.code_bits = CODE_EMPTY
     
     def check_complete_sequence(self):
         """检查是否完成了一个完整的数字序列"""
-        seq_length = len(self.current_number_sequence)
+        seq_length = len(self.sequence_digits)
         
         # 如果达到预期长度（3位或4位），保存序列
         if seq_length in self.expected_digits:
             sequence_info = {
                 'sequence': self.current_number_sequence,
                 'length': seq_length,
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
                 'complete_time': time.time()
             }
             self.number_sequences.append(sequence_info)
             
             # 重置当前序列
-            self.current_number_sequence = ""
+            self.sequence_digits.clear()
         elif seq_length > max(self.expected_digits):
             # 如果超过最大预期长度，重置序列
-            self.current_number_sequence = ""
+            self.sequence_digits.clear()
 
     def audio_callback(self, audio_data, frames):
-        """音频回调函数"""
-        self.process_audio_chunk(audio_data)
+        """音频回调函数：只把数据复制进环形缓冲区，处理在解码线程中进行"""
+        self.audio_ring.write(audio_data)
+        self.audio_ready.set()
+
+    def audio_written(self, audio_data, frames):
+        """音频流已把数据写入audio_ring时的回调：只唤醒解码线程"""
+        self.audio_ready.set()
 
     def save_result(self):
-        """保存解码结果"""
+        """保存解码结果（先在内存中拼好整份报告，再一次性写入文件）"""
         if self.number_sequences:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"morse_numbers_{timestamp}.txt"
+            now = time.localtime()
+            filename = f"morse_numbers_{time.strftime('%Y%m%d_%H%M%S', now)}.txt"
             try:
+                lines = [
+                    "三角洲摩斯电码数字解码结果\n",
+                    f"解码时间: {time.strftime('%Y-%m-%d %H:%M:%S', now)}\n",
+                    f"运行时长: {self.get_runtime()}\n",
+                    f"总信号数: {self.total_signals}\n",
+                    f"总数字数: {self.total_letters}\n",
+                    f"完整序列数: {len(self.number_sequences)}\n",
+                    f"当前序列: {self.current_number_sequence}\n\n",
+                    "完整数字序列:\n",
+                    "-" * 50 + "\n",
+                ]
+                for i, seq in enumerate(self.number_sequences, 1):
+                    forced = " (强制完成)" if seq.get('forced', False) else ""
+                    completed = format_clock(int(seq['complete_time']))
+                    lines.append(f"{i:3d}. {seq['sequence']} ({seq['length']}位) - {completed}{forced}\n")
+                
+                # 添加密码候选分析
+                lines.append("\n" + "="*50 + "\n")
+                lines.append("密码候选分析 (容错排列)\n")
+                lines.append("="*50 + "\n\n")
+                
+                candidates = self.analyze_recent_sequences(max_sequences=5)
+                if candidates:
+                    current_original = None
+                    for candidate in candidates:
+                        if candidate['original'] != current_original:
+                            current_original = candidate['original']
+                            lines.append(f"\n原始序列: {current_original}\n")
+                            lines.append("-" * 30 + "\n")
+                        
+                        confidence_desc = "高" if candidate['confidence'] >= 80 else "中" if candidate['confidence'] >= 60 else "低"
+                        lines.append(f"  密码: {candidate['password']} (置信度: {candidate['confidence']}% - {confidence_desc})\n")
+                else:
+                    lines.append("暂无足够数据进行密码候选分析\n")
+                
+                lines.append("\n注意: 如果密码顺序不对，请尝试上述候选密码\n")
+                lines.append("置信度说明: 高(≥80%) > 中(≥60%) > 低(<60%)\n")
+                
                 with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(f"三角洲摩斯电码数字解码结果\n")
-                    f.write(f"解码时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"运行时长: {self.get_runtime()}\n")
-                    f.write(f"总信号数: {self.total_signals}\n")
-                    f.write(f"总数字数: {self.total_letters}\n")
-                    f.write(f"完整序列数: {len(self.number_sequences)}\n")
-                    f.write(f"当前序列: {self.current_number_sequence}\n\n")
-                    
-                    f.write("完整数字序列:\n")
-                    f.write("-" * 50 + "\n")
-                    for i, seq in enumerate(self.number_sequences, 1):
-                        forced = " (强制完成)" if seq.get('forced', False) else ""
-                        f.write(f"{i:3d}. {seq['sequence']} ({seq['length']}位) - {seq['timestamp']}{forced}\n")
-                    
-                    # 添加密码候选分析
-                    f.write("\n" + "="*50 + "\n")
-                    f.write("密码候选分析 (容错排列)\n")
-                    f.write("="*50 + "\n\n")
-                    
-                    candidates = self.analyze_recent_sequences(max_sequences=5)
-                    if candidates:
-                        current_original = None
-                        for candidate in candidates:
-                            if candidate['original'] != current_original:
-                                current_original = candidate['original']
-                                f.write(f"\n原始序列: {current_original}\n")
-                                f.write("-" * 30 + "\n")
-                            
-                            confidence_desc = "高" if candidate['confidence'] >= 80 else "中" if candidate['confidence'] >= 60 else "低"
-                            f.write(f"  密码: {candidate['password']} (置信度: {candidate['confidence']}% - {confidence_desc})\n")
-                    else:
-                        f.write("暂无足够数据进行密码候选分析\n")
-                    
-                    f.write(f"\n注意: 如果密码顺序不对，请尝试上述候选密码\n")
-                    f.write(f"置信度说明: 高(≥80%) > 中(≥60%) > 低(<60%)\n")
+                    f.write("".join(lines))
                 
                 self.console.print(f"[green]结果已保存到: {filename}[/green]")
             except Exception as e:
@@ -399,93 +783,97 @@ class MorseCodeDecoderGUI:
 
     def reset_text(self):
         """重置解码数据"""
-        self.current_number_sequence = ""
-        self.current_code = ""
+        self.sequence_digits.clear()
+        self.code_bits = CODE_EMPTY
         self.total_letters = 0
         self.number_sequences.clear()
-        self.signal_history.clear()
+        self.signal_count = 0
         self.password_candidates.clear()
 
     def handle_keyboard_events(self):
-        """处理键盘事件"""
+        """处理键盘事件：getwch阻塞等待按键，不再轮询"""
+        if msvcrt is None:
+            return
+        # 键盘线程是守护线程，程序退出时不需要唤醒阻塞中的getwch
         while self.running:
             try:
-                if msvcrt.kbhit():
-                    key = msvcrt.getch()
-                    
-                    # 处理特殊键（箭头键等）
-                    if key == b'\xe0':  # 特殊键前缀
-                        key = msvcrt.getch()
-                        if key == b'H':  # 上箭头
-                            self.adjust_threshold(0.001)
-                        elif key == b'P':  # 下箭头
-                            self.adjust_threshold(-0.001)
-                    else:
-                        # 处理普通键
-                        try:
-                            key_char = key.decode('utf-8').lower()
-                            if key_char == '\x1b':  # ESC键
-                                self.running = False
-                                break
-                            elif key_char == 'r':
-                                self.reset_text()
-                            elif key_char == 's':
-                                self.save_result()
-                            elif key_char == 'p':
-                                self.show_permutations = not self.show_permutations
-                            elif key_char.isdigit() and key_char != '0':
-                                # 数字键1-9快速设置阈值
-                                quick_threshold = int(key_char) * 0.001
-                                self.threshold = quick_threshold
-                        except UnicodeDecodeError:
-                            continue
-                            
-                time.sleep(0.1)
+                key = msvcrt.getwch()
+                
+                # 处理特殊键（箭头键等）
+                if key in ('\x00', '\xe0'):  # 特殊键前缀
+                    key = msvcrt.getwch()
+                    if key == 'H':  # 上箭头
+                        self.adjust_threshold(0.001)
+                    elif key == 'P':  # 下箭头
+                        self.adjust_threshold(-0.001)
+                else:
+                    self.dispatch_key(key.lower())
             except Exception:
                 continue
     
+    def dispatch_key(self, key_char):
+        """处理普通按键"""
+        if key_char == '\x1b':  # ESC键
+            self.running = False
+        elif key_char == '\x03':  # Ctrl+C：getwch读取时不会产生SIGINT，转交主线程
+            _thread.interrupt_main()
+        elif key_char == 'r':
+            self.reset_text()
+        elif key_char == 's':
+            self.save_result()
+        elif key_char == 'p':
+            self.show_permutations = not self.show_permutations
+        elif key_char == 'g':
+            self.use_goertzel = not self.use_goertzel
+        elif key_char == 'a':
+            self.auto_threshold = not self.auto_threshold
+        elif key_char == '[':
+            lowcut, highcut = self.requested_band
+            self.retune_filter(lowcut - FILTER_TUNE_STEP, highcut - FILTER_TUNE_STEP)
+        elif key_char == ']':
+            lowcut, highcut = self.requested_band
+            self.retune_filter(lowcut + FILTER_TUNE_STEP, highcut + FILTER_TUNE_STEP)
+        elif key_char.isdigit() and key_char != '0':
+            # 数字键1-9快速设置阈值
+            quick_threshold = int(key_char) * 0.001
+            self.auto_threshold = False
+            self.threshold = quick_threshold
+    
     def adjust_threshold(self, delta):
         """调节阈值"""
         new_threshold = self.threshold + delta
         if new_threshold > 0:
+            self.auto_threshold = False
             self.threshold = new_threshold
 
-    def generate_password_permutations(self, password):
-        """生成密码的所有可能排列"""
-        if len(password) < 3 or len(password) > 4:
-            return []
-        
-        # 生成所有排列
-        all_perms = list(itertools.permutations(password))
-        # 转换为字符串列表
-        perm_strings = [''.join(perm) for perm in all_perms]
-        # 去重并排序
-        unique_perms = sorted(list(set(perm_strings)))
-        
-        return unique_perms
-
     def analyze_recent_sequences(self, max_sequences=3):
         """分析最近的数字序列，生成可能的密码组合"""
         if len(self.number_sequences) == 0:
             return []
         
         recent_sequences = self.number_sequences[-max_sequences:]
+        # 界面每秒刷新多次，但序列很少变化，输入相同时直接返回上次的结果
+        key = (max_sequences,) + tuple(
+            (seq_info['sequence'], seq_info['complete_time']) for seq_info in recent_sequences
+        )
+        if key == self.analysis_cache[0]:
+            return self.analysis_cache[1]
+        
         all_candidates = []
         
         for seq_info in recent_sequences:
             sequence = seq_info['sequence']
-            timestamp = seq_info['timestamp']
-            
-            # 生成该序列的所有排列
-            permutations = self.generate_password_permutations(sequence)
+            complete_time = seq_info['complete_time']
+            if len(sequence) < 3 or len(sequence) > 4:
+                continue
             
-            # 为每个排列添加分析信息
-            for perm in permutations:
+            # 该序列的所有排列及其置信度
+            for perm, confidence in score_permutations(sequence):
                 candidate = {
                     'password': perm,
                     'original': sequence,
-                    'timestamp': timestamp,
-                    'confidence': self.calculate_confidence(perm, sequence),
+                    'complete_time': complete_time,
+                    'confidence': confidence,
                     'length': len(perm)
                 }
                 all_candidates.append(candidate)
@@ -493,69 +881,9 @@ class MorseCodeDecoderGUI:
         # 按置信度排序
         all_candidates.sort(key=lambda x: x['confidence'], reverse=True)
         
-        return all_candidates[:12]  # 返回最多12个候选
-
-    def calculate_confidence(self, permutation, original):
-        """计算密码排列的置信度"""
-        confidence = 50  # 基础置信度
-        
-        # 如果排列与原序列相同，置信度最高
-        if permutation == original:
-            confidence = 95
-        
-        # 检查常见密码模式
-        # 顺序递增模式 (如123, 1234)
-        if self.is_sequential_ascending(permutation):
-            confidence += 20
-        
-        # 顺序递减模式 (如321, 4321)
-        elif self.is_sequential_descending(permutation):
-            confidence += 15
-        
-        # 重复数字较少的排列置信度更高
-        unique_digits = len(set(permutation))
-        if unique_digits == len(permutation):  # 所有数字都不重复
-            confidence += 10
-        elif unique_digits == len(permutation) - 1:  # 只有一个重复
-            confidence += 5
-        
-        # 避免过多连续相同数字
-        max_consecutive = self.get_max_consecutive_digits(permutation)
-        if max_consecutive > 2:
-            confidence -= 10 * (max_consecutive - 2)
-        
-        return min(max(confidence, 0), 100)  # 限制在0-100之间
-
-    def is_sequential_ascending(self, sequence):
-        """检查是否为递增序列"""
-        for i in range(len(sequence) - 1):
-            if int(sequence[i]) >= int(sequence[i + 1]):
-                return False
-        return True
-
-    def is_sequential_descending(self, sequence):
-        """检查是否为递减序列"""
-        for i in range(len(sequence) - 1):
-            if int(sequence[i]) <= int(sequence[i + 1]):
-                return False
-        return True
-
-    def get_max_consecutive_digits(self, sequence):
-        """获取最大连续相同数字的长度"""
-        if len(sequence) <= 1:
-            return len(sequence)
-        
-        max_count = 1
-        current_count = 1
-        
-        for i in range(1, len(sequence)):
-            if sequence[i] == sequence[i-1]:
-                current_count += 1
-                max_count = max(max_count, current_count)
-            else:
-                current_count = 1
-        
-        return max_count
+        candidates = all_candidates[:12]  # 返回最多12个候选
+        self.analysis_cache = (key, candidates)
+        return candidates
 
 def find_delta_force_process():
     """查找三角洲相关进程"""
@@ -608,11 +936,14 @@ def main():
         # 启动键盘监听线程
         keyboard_thread = threading.Thread(target=decoder.handle_keyboard_events, daemon=True)
         keyboard_thread.start()
+        
+        # 启动解码线程
+        decoder.start_decoding()
 
         # 创建音频捕获
         try:
             with AudioCapture() as capture:
-                if not capture.start_capture(pid, sample_rate=decoder.sample_rate, channels=2):
+                if not capture.start_capture(pid, sample_rate=decoder.sample_rate, channels=decoder.channels):
                     console.print("[red]❌ 无法启动音频捕获，请检查进程权限[/red]")
                     input("按回车键退出...")
                     return
@@ -621,19 +952,22 @@ def main():
                 console.print("[cyan]💡 使用↑↓键调节阈值，1-9键快速设置阈值[/cyan]")
                 time.sleep(2)  # 给用户时间看到消息
 
-                stream = AudioStream(capture, callback=decoder.audio_callback)
+                # 采集线程直接写入解码器的环形缓冲区
+                stream = AudioStream(capture, callback=decoder.audio_written, ring=decoder.audio_ring)
                 stream.start()
 
                 try:
-                    with Live(decoder.render_interface(), refresh_per_second=10, screen=True) as live:
+                    # 关闭自动刷新线程，由主循环每次更新后刷新一次
+                    with Live(decoder.render_interface(), auto_refresh=False, screen=True) as live:
                         while decoder.running:
-                            live.update(decoder.render_interface())
+                            live.update(decoder.render_interface(), refresh=True)
                             time.sleep(0.1)
                 except KeyboardInterrupt:
                     pass
                 finally:
                     decoder.running = False
                     stream.stop()
+                    decoder.stop_decoding()
                     console.print("\n[cyan]🛑 程序已停止[/cyan]")
                     if decoder.number_sequences:
                         console.print(f"[green]📝 共解码 {len(decoder.number_sequences)} 个完整数字序列[/green]")
@@ -7,13 +7,18 @@ Windows Audio Capture Python Interface
 
 import ctypes
 import ctypes.wintypes
+import functools
 import numpy as np
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
+import sys
 import time
 import threading
 from ctypes import Structure, c_float, c_uint, c_ushort, c_void_p, POINTER
 
 
+THREAD_PRIORITY_TIME_CRITICAL = 15  # MMCSS不可用时采集线程使用的优先级
+
+
 class AudioCapture:
     """音频捕获类，用于从特定进程捕获音频数据"""
     
@@ -37,6 +42,11 @@ class AudioCapture:
         self.sample_rate = 44100
         self.channels = 2
         
+        # 读取用的缓冲区，跨调用复用，只在容量不够时重新分配
+        self._buffer = None
+        self._buffer_ptrs = None  # 缓冲区中每次读取起始位置的指针，缓冲区重新分配前保持不变
+        self._buffer_layout = None  # 缓冲区对应的(frames, max_reads, channels)
+        
     def _setup_function_signatures(self):
         """设置C函数的参数和返回值类型"""
         # sca_create_capture(pid, sample_rate, channels) -> handle
@@ -44,8 +54,11 @@ class AudioCapture:
         self.dll.sca_create_capture.restype = c_void_p
         
         # sca_read_audio_frames(handle, buffer, frames) -> frames_read
+        # 通过CDLL调用时ctypes会在调用期间释放GIL，其他线程可以继续运行；
+        # 同一个句柄同一时刻只能由一个线程读取（AudioStream的采集线程）
         self.dll.sca_read_audio_frames.argtypes = [c_void_p, POINTER(c_float), c_uint]
         self.dll.sca_read_audio_frames.restype = c_uint
+        self._read_frames = self.dll.sca_read_audio_frames  # 读取路径上直接使用，省去属性查找
         
         # sca_destroy_capture(handle)
         self.dll.sca_destroy_capture.argtypes = [c_void_p]
@@ -77,40 +90,82 @@ class AudioCapture:
         self.is_capturing = True
         return True
     
-    def read_audio(self, frames: int = 1024) -> Optional[np.ndarray]:
+    def read_audio(self, frames: int = 1024, max_reads: int = 1) -> Optional[np.ndarray]:
         """
         读取音频数据
         
         Args:
-            frames: 要读取的音频帧数
+            frames: 每次从DLL读取的音频帧数
+            max_reads: 最多连续读取的次数，DLL中积压的数据较多时一次取回，
+                       某次读到的帧数不足frames时即停止
             
         Returns:
-            numpy数组包含音频数据，形状为(frames_read, channels)，如果没有数据则返回None
+            numpy数组包含音频数据，形状为(frames_read, channels)，如果没有数据则返回None。
+            数组引用内部复用的缓冲区，下次调用read_audio时会被覆盖，需要保留时请先复制
         """
         if not self.is_capturing or self.handle is None:
             return None
             
-        # 创建缓冲区
-        buffer_size = frames * self.channels
-        buffer = (c_float * buffer_size)()
+        # 复用(frames * max_reads, channels)形状的缓冲区，避免每次读取都分配内存；DLL直接写入NumPy数组
+        layout = (frames, max_reads, self.channels)
+        if layout != self._buffer_layout:
+            self._buffer = np.empty((frames * max_reads, self.channels), dtype=np.float32)
+            self._buffer_ptrs = [self._buffer[i * frames:].ctypes.data_as(POINTER(c_float))
+                                 for i in range(max_reads)]
+            self._buffer_layout = layout
         
-        # 读取音频数据
-        frames_read = self.dll.sca_read_audio_frames(self.handle, buffer, frames)
+        # 读取音频数据，读满一次才继续读下一次
+        read_frames = self._read_frames
+        handle = self.handle
+        frames_read = 0
+        for buffer_ptr in self._buffer_ptrs:
+            count = read_frames(handle, buffer_ptr, frames)
+            frames_read += count
+            if count < frames:
+                break
         
         if frames_read == 0:
             return None
             
-        # 转换为numpy数组 - 使用ctypes.cast和from_address来获取正确的缓冲区
-        buffer_ptr = ctypes.cast(buffer, ctypes.POINTER(ctypes.c_float))
-        audio_data = np.ctypeslib.as_array(buffer_ptr, shape=(frames_read * self.channels,))
+        # 缓冲区本身就是(frames, channels)格式，切出已读取的行即可，不复制也不重塑；
+        # 返回的是视图，AudioStream的回调也因此只能在调用期间使用它
+        return self._buffer[:frames_read]
+    
+    def read_audio_into(self, out: np.ndarray, frames: int = 1024) -> int:
+        """
+        把音频数据直接读入调用方提供的数组，由DLL写入，不经过中间缓冲区
         
-        # 重塑为(frames, channels)格式
-        if self.channels > 1:
-            audio_data = audio_data.reshape(-1, self.channels)
-        else:
-            audio_data = audio_data.reshape(-1, 1)
+        Args:
+            out: C连续的float32数组，形状为(n, channels)
+            frames: 每次从DLL读取的帧数，连续读取直到out填满或某次读不满
             
-        return audio_data
+        Returns:
+            int: 实际读取的帧数
+            
+        Raises:
+            ValueError: out不是C连续的(n, channels) float32数组
+        """
+        # DLL按帧数直接写内存，布局不符会越界写入
+        if (out.dtype != np.float32 or not out.flags.c_contiguous
+                or out.ndim != 2 or out.shape[1] != self.channels):
+            raise ValueError(
+                f"out必须是C连续的float32数组，形状为(n, {self.channels}): "
+                f"dtype={out.dtype}, shape={out.shape}, "
+                f"c_contiguous={out.flags.c_contiguous}")
+        if not self.is_capturing or self.handle is None:
+            return 0
+        read_frames = self._read_frames
+        handle = self.handle
+        total = len(out)
+        frames_read = 0
+        while frames_read < total:
+            request = min(frames, total - frames_read)
+            buffer_ptr = out[frames_read:].ctypes.data_as(POINTER(c_float))
+            count = read_frames(handle, buffer_ptr, request)
+            frames_read += count
+            if count < request:
+                break
+        return frames_read
     
     def stop_capture(self):
         """停止音频捕获"""
@@ -128,23 +183,115 @@ class AudioCapture:
         self.stop_capture()
 
 
+class AudioRingBuffer:
+    """单生产者单消费者(SPSC)的无锁音频环形缓冲区
+    
+    生产者(采集线程)只修改write_pos，消费者只修改read_pos，两端无需加锁。
+    容量(帧数)必须是2的幂，下标用掩码回绕。读写都提供切片接口，
+    回绕处分为两段连续的视图，可以直接在缓冲区内存上读写而不复制。
+    """
+    
+    def __init__(self, capacity: int, channels: int = 2):
+        """
+        初始化环形缓冲区
+        
+        Args:
+            capacity: 容量（帧数），必须是2的幂
+            channels: 声道数
+        """
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"容量必须是2的幂: {capacity}")
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.channels = channels
+        self.data = np.empty((capacity, channels), dtype=np.float32)
+        self.read_pos = 0  # 累计读取的帧数，只由消费者修改
+        self.write_pos = 0  # 累计写入的帧数，只由生产者修改
+        self.dropped = 0  # 缓冲区满时丢弃的帧数
+    
+    def write_slices(self, frames: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取可写入的空闲区域（仅生产者调用），写完后调用commit_write发布
+        
+        Returns:
+            两段连续的视图，总长度为min(frames, 空闲帧数)，不回绕时第二段为空
+        """
+        start = self.write_pos & self.mask
+        count = min(frames, self.capacity - (self.write_pos - self.read_pos))
+        first = min(count, self.capacity - start)
+        return self.data[start:start + first], self.data[:count - first]
+    
+    def commit_write(self, frames: int):
+        """发布已写入的帧，先写数据再移动写位置"""
+        self.write_pos += frames
+    
+    def write(self, audio_data: np.ndarray) -> int:
+        """
+        复制写入音频数据（仅生产者调用），放不下的部分被丢弃
+        
+        Returns:
+            实际写入的帧数
+        """
+        first, second = self.write_slices(len(audio_data))
+        count = len(first) + len(second)
+        first[:] = audio_data[:len(first)]
+        second[:] = audio_data[len(first):count]
+        self.dropped += len(audio_data) - count
+        self.commit_write(count)
+        return count
+    
+    def read_slices(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取所有未读的帧（仅消费者调用），用完后调用commit_read释放
+        
+        Returns:
+            两段连续的视图，不回绕时第二段为空
+        """
+        start = self.read_pos & self.mask
+        count = self.write_pos - self.read_pos
+        first = min(count, self.capacity - start)
+        return self.data[start:start + first], self.data[:count - first]
+    
+    def commit_read(self, frames: int):
+        """释放已读取的帧，之后生产者可以覆盖这部分空间"""
+        self.read_pos += frames
+    
+    def read(self) -> np.ndarray:
+        """取出所有未读的帧（仅消费者调用），返回连续的副本"""
+        first, second = self.read_slices()
+        audio_data = np.concatenate((first, second))
+        self.commit_read(len(audio_data))
+        return audio_data
+
+
 class AudioStream:
     """音频流类，提供连续的音频数据流"""
     
-    def __init__(self, capture: AudioCapture, callback=None, frames_per_buffer: int = 1024):
+    def __init__(self, capture: AudioCapture, callback=None, frames_per_buffer: int = 1024,
+                 ring: Optional[AudioRingBuffer] = None, affinity_mask: int = 0,
+                 reads_per_callback: int = 4):
         """
         初始化音频流
         
         Args:
             capture: AudioCapture实例
-            callback: 音频数据回调函数，接收(audio_data, frames)参数
+            callback: 音频数据回调函数，接收(audio_data, frames)参数。
+                      audio_data是复用缓冲区（或ring）的视图，只在本次调用期间有效，
+                      之后会被下一次读取覆盖；需要保留或交给其他线程时请先复制
             frames_per_buffer: 每次读取的帧数
+            ring: 可选的环形缓冲区，音频由DLL直接写入其中，再调用callback通知消费者
+            affinity_mask: 采集线程的CPU亲和性掩码，0表示不限制（仅Windows）
+            reads_per_callback: DLL中有积压时，每次回调前最多连续读取的次数
         """
         self.capture = capture
         self.callback = callback
         self.frames_per_buffer = frames_per_buffer
+        self.ring = ring
+        self.affinity_mask = affinity_mask
+        self.reads_per_callback = max(1, reads_per_callback)
         self.is_streaming = False
         self.thread = None
+        self._stop_event = threading.Event()  # stop()时唤醒等待中的工作线程
     
     def start(self):
         """开始音频流"""
@@ -152,48 +299,204 @@ class AudioStream:
             return
             
         self.is_streaming = True
+        self._stop_event.clear()
+        # Windows默认计时器精度约15.6ms，提高到1ms，等待时间才能接近设定值
+        if sys.platform == 'win32':
+            ctypes.windll.winmm.timeBeginPeriod(1)
         self.thread = threading.Thread(target=self._stream_worker)
         self.thread.start()
     
     def stop(self):
         """停止音频流"""
+        if not self.is_streaming:
+            return
         self.is_streaming = False
+        self._stop_event.set()
         if self.thread is not None:
             self.thread.join()
             self.thread = None
+        if sys.platform == 'win32':
+            ctypes.windll.winmm.timeEndPeriod(1)
     
     def _stream_worker(self):
         """音频流工作线程"""
-        while self.is_streaming:
-            audio_data = self.capture.read_audio(self.frames_per_buffer)
-            
-            if audio_data is not None and self.callback is not None:
-                self.callback(audio_data, len(audio_data))
-            
-            # 短暂休眠避免CPU占用过高
-            time.sleep(0.001)
+        mmcss_handle = self._raise_thread_priority()
+        try:
+            # 没有数据时等待半个缓冲区的时长，有数据时立即继续读取
+            idle_wait = self.frames_per_buffer / self.capture.sample_rate * 0.5
+            # 循环中用到的对象先取到局部变量，避免每次迭代重复查找属性
+            if self.ring is not None:
+                read = self._read_into_ring
+            else:
+                read = functools.partial(self.capture.read_audio, self.frames_per_buffer, self.reads_per_callback)
+            callback = self.callback
+            stop_event = self._stop_event
+            while not stop_event.is_set():
+                audio_data = read()
+                
+                if audio_data is None:
+                    stop_event.wait(idle_wait)
+                    continue
+                
+                if callback is not None:
+                    callback(audio_data, len(audio_data))
+        finally:
+            self._restore_thread_priority(mmcss_handle)
+    
+    def _raise_thread_priority(self):
+        """
+        提升当前（采集）线程的调度优先级，仅Windows有效
+        
+        优先注册为MMCSS的"Pro Audio"任务，不可用时退回THREAD_PRIORITY_TIME_CRITICAL
+        
+        Returns:
+            MMCSS任务句柄，未注册时返回None
+        """
+        if sys.platform != 'win32':
+            return None
+        
+        kernel32 = ctypes.WinDLL('kernel32')
+        kernel32.GetCurrentThread.restype = ctypes.wintypes.HANDLE
+        thread = kernel32.GetCurrentThread()
+        if self.affinity_mask:
+            kernel32.SetThreadAffinityMask.argtypes = [ctypes.wintypes.HANDLE, ctypes.c_size_t]
+            kernel32.SetThreadAffinityMask(thread, self.affinity_mask)
+        
+        try:
+            avrt = ctypes.WinDLL('avrt')
+            avrt.AvSetMmThreadCharacteristicsW.argtypes = [ctypes.wintypes.LPCWSTR, POINTER(ctypes.wintypes.DWORD)]
+            avrt.AvSetMmThreadCharacteristicsW.restype = ctypes.wintypes.HANDLE
+            task_index = ctypes.wintypes.DWORD(0)
+            mmcss_handle = avrt.AvSetMmThreadCharacteristicsW("Pro Audio", ctypes.byref(task_index))
+        except OSError:
+            mmcss_handle = None
+        if mmcss_handle:
+            return mmcss_handle
+        
+        kernel32.SetThreadPriority.argtypes = [ctypes.wintypes.HANDLE, ctypes.c_int]
+        kernel32.SetThreadPriority(thread, THREAD_PRIORITY_TIME_CRITICAL)
+        return None
+    
+    def _restore_thread_priority(self, mmcss_handle):
+        """撤销MMCSS注册；直接设置的线程优先级随线程结束而失效"""
+        if mmcss_handle:
+            avrt = ctypes.WinDLL('avrt')
+            avrt.AvRevertMmThreadCharacteristics.argtypes = [ctypes.wintypes.HANDLE]
+            avrt.AvRevertMmThreadCharacteristics(mmcss_handle)
+    
+    def _read_into_ring(self) -> Optional[np.ndarray]:
+        """让DLL直接把音频写入环形缓冲区的空闲区域，返回写入部分的视图"""
+        # 只用不回绕的第一段，回绕后的部分留给下一次读取
+        region = self.ring.write_slices(self.frames_per_buffer * self.reads_per_callback)[0]
+        if len(region) == 0:
+            # 消费者跟不上：读出并丢弃，避免采集端积压造成延迟
+            audio_data = self.capture.read_audio(self.frames_per_buffer, self.reads_per_callback)
+            if audio_data is not None:
+                self.ring.dropped += len(audio_data)
+            return None
+        
+        frames_read = self.capture.read_audio_into(region, self.frames_per_buffer)
+        if frames_read == 0:
+            return None
+        self.ring.commit_write(frames_read)
+        return region[:frames_read]
 
 
-def get_process_list() -> list:
+def compute_rms(audio_data: np.ndarray) -> float:
     """
-    获取当前运行的进程列表
+    计算音频数据的RMS音量
+    
+    用内积求平方和，不像np.mean(audio_data ** 2)那样分配临时数组
     
+    Args:
+        audio_data: 音频数据，任意形状
+        
     Returns:
-        包含(pid, process_name)元组的列表
+        float: 所有采样的RMS值，没有数据时返回0.0
+    """
+    samples = audio_data.ravel()
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.dot(samples, samples) / samples.size))
+
+
+def compute_channel_rms(audio_data: np.ndarray) -> np.ndarray:
+    """
+    分别计算每个声道的RMS音量
+    
+    用einsum按列求平方和，同样不分配临时数组
+    
+    Args:
+        audio_data: 形状为(frames, channels)的音频数据
+        
+    Returns:
+        长度为channels的数组，没有数据时全为0
+    """
+    if len(audio_data) == 0:
+        return np.zeros(audio_data.shape[1], dtype=np.float32)
+    return np.sqrt(np.einsum('ij,ij->j', audio_data, audio_data) / len(audio_data))
+
+
+def iter_processes() -> Iterator[Tuple[int, str]]:
+    """
+    逐个产生当前运行的进程，调用方找到需要的进程后可以提前停止枚举
+    
+    Yields:
+        (pid, process_name)元组
     """
     import psutil
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name']):
+    for proc in psutil.process_iter():
         try:
-            processes.append((proc.info['pid'], proc.info['name']))
+            yield proc.pid, proc.name()
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
-    return processes
+
+
+@functools.lru_cache(maxsize=1)
+def _process_snapshot(time_bucket: int) -> Tuple[Tuple[int, str], ...]:
+    """
+    枚举一次进程，同一个时间段（秒）内的调用复用同一份快照
+    
+    Args:
+        time_bucket: 当前的整数秒，变化时重新枚举
+        
+    Returns:
+        (pid, process_name)元组组成的元组
+    """
+    return tuple(iter_processes())
+
+
+@functools.lru_cache(maxsize=1)
+def _process_index(time_bucket: int) -> dict:
+    """
+    按进程名（casefold后）索引同一份快照，查找时只需一次哈希
+    
+    Args:
+        time_bucket: 当前的整数秒，与_process_snapshot一致
+        
+    Returns:
+        {进程名: pid}，同名进程保留枚举时的第一个
+    """
+    index = {}
+    for pid, process_name in _process_snapshot(time_bucket):
+        if process_name:
+            index.setdefault(process_name.casefold(), pid)
+    return index
+
+
+def get_process_list() -> list:
+    """
+    获取当前运行的进程列表（1秒内的重复调用复用同一份快照）
+    
+    Returns:
+        包含(pid, process_name)元组的列表
+    """
+    return list(_process_snapshot(int(time.monotonic())))
 
 
 def find_process_by_name(name: str) -> Optional[int]:
     """
-    根据进程名查找进程ID
+    根据进程名查找进程ID（1秒内的重复调用复用同一份快照）
     
     Args:
         name: 进程名（例如："chrome.exe"）
@@ -201,23 +504,18 @@ def find_process_by_name(name: str) -> Optional[int]:
     Returns:
         进程ID，如果未找到则返回None
     """
-    import psutil
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            if proc.info['name'].lower() == name.lower():
-                return proc.info['pid']
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return None
+    # casefold比lower更适合做不区分大小写的比较
+    return _process_index(int(time.monotonic())).get(name.casefold())
 
 
 # 示例用法
 if __name__ == "__main__":
     def audio_callback(audio_data, frames):
         """音频数据回调函数示例"""
-        # 计算音频的音量（RMS）
-        rms = np.sqrt(np.mean(audio_data ** 2))
-        print(f"收到 {frames} 帧音频数据，音量: {rms:.4f}")
+        # 计算音频的音量（RMS），整体和各声道都不分配临时数组
+        rms = compute_rms(audio_data)
+        channel_rms = " / ".join(f"{value:.4f}" for value in compute_channel_rms(audio_data))
+        print(f"收到 {frames} 帧音频数据，音量: {rms:.4f}（各声道: {channel_rms}）")
         
     
     # 查找Chrome进程（示例）